@@ -7,10 +7,15 @@ from board_config import display_drv
 from displaybuf import DisplayBuffer as SSD
 from palettes import get_palette
 from mpdisplay import Events
-from playing_cards import Cards, Hand
+from playing_cards import Cards, Hand, enable_stats, get_stats, phase
 from time import sleep
 
 
+PROFILE = False  # Set to True to print timing stats for each phase of the game on exit
+if PROFILE:
+    enable_stats()
+
+
 display_drv.rotation = 90
 ssd = SSD(display_drv, SSD.GS4_HMSB)
 
@@ -83,7 +88,7 @@ class Game(Cards):
     def reset(self, area=None):
         if area:
             self.show(self._target.fill_rect(*area, self._table_color))
-        for card in self.in_play:
+        for card in reversed(self.in_play):  # Top down, the reverse of the deal
             self.show(card.erase())
         self.player1.clear()
         self.dealer.clear()
@@ -124,6 +129,8 @@ class Game(Cards):
                         self.show(self.button1.text("Play"))
                         self.show(self.button2.text("Exit"))
                     elif self.button2.hit_test(x, y):
+                        if stats := get_stats():
+                            print(stats.to_json())
                         return
 
     def play_hand(self, last_message_area):
@@ -131,28 +138,30 @@ class Game(Cards):
         self.show(self.button1.text("Hit"))
         self.show(self.button2.text("Stand"))
         
-        self.show(self.player1.place(self.draw_one()))
-        self.show(self.dealer.place(self.draw_one()))
-        self.show(self.player1.place(self.draw_one()))
-        self.show(self.dealer.place(self.draw_one(), top_card=True))
+        with phase("deal"):
+            self.show(self.player1.place(self.draw_one()))
+            self.show(self.dealer.place(self.draw_one()))
+            self.show(self.player1.place(self.draw_one()))
+            self.show(self.dealer.place(self.draw_one(), top_card=True))
 
         # Player's turn
-        while True:
-            if choice := self.poll():
-                if choice == "hit":
-                    self.show(self.player1.place(self.draw_one()))
-                    if self.calculate_hand_value(self.player1.in_pile) > 21:
-                        self.show(self.dealer.in_pile[1].reveal())
-                        text = "Player busts!\nDealer wins."
-                        return self.print_message(text, self._palette.RED)
-                elif choice == "stand":
-                    break
+        with phase("player turn"):
+            while True:
+                if choice := self.poll():
+                    if choice == "hit":
+                        self.show(self.player1.place(self.draw_one()))
+                        if self.calculate_hand_value(self.player1.in_pile) > 21:
+                            self.show(self.dealer.in_pile[1].reveal())
+                            text = "Player busts!\nDealer wins."
+                            return self.print_message(text, self._palette.RED)
+                    elif choice == "stand":
+                        break
 
         # Dealer's turn
-        
-        self.show(self.dealer.in_pile[1].reveal())
-        while self.calculate_hand_value(self.dealer.in_pile) < 17:
-            self.show(self.dealer.place(self.draw_one()))
+        with phase("dealer turn"):
+            self.show(self.dealer.in_pile[1].reveal())
+            while self.calculate_hand_value(self.dealer.in_pile) < 17:
+                self.show(self.dealer.place(self.draw_one()))
 
         # Determine the winner
         player_value = self.calculate_hand_value(self.player1.in_pile)
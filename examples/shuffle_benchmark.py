@@ -0,0 +1,114 @@
+"""
+Shuffle Benchmark - compares the speed and quality of the Cards shuffling strategies.
+No display is needed, but NumPy is, so run it with CPython.
+
+For each strategy it measures deals per second (shuffle, then draw every card) and
+checks that every card is equally likely to end up in every position with a
+chi-square test.  The Cards strategies are tested as implemented; the vectorized
+models of the same algorithms are tested over many more shuffles.
+"""
+
+import numpy as np
+from time import perf_counter
+from graphics.palettes import get_palette
+from playing_cards import Cards, fisher_yates, riffle
+from playing_cards_shuffle import (
+    BatchShuffler,
+    permutations,
+    fisher_yates_permutations,
+    riffle_permutations,
+)
+
+
+palette = get_palette(color_depth=4)
+
+CARDS_STRATEGIES = [
+    ("random draw", None),
+    ("fisher_yates", fisher_yates),
+    ("riffle x7", riffle),
+    ("numpy batch", BatchShuffler()),
+]
+
+VECTORIZED_STRATEGIES = [
+    ("fisher_yates", fisher_yates_permutations),
+    ("numpy permutation", permutations),
+    ("riffle x7", riffle_permutations),
+]
+
+DURATION = 1.0  # Seconds to measure speed for
+CARDS_SHUFFLES = 20_000
+VECTORIZED_SHUFFLES = 2_000_000
+CHUNK = 50_000
+CRITICAL_Z = 3.09  # Fail if a bias this unlikely (p < 0.001) is found
+
+
+def chi_square(counts):
+    # Returns the chi-square statistic of a cards x positions count matrix against a
+    # uniform distribution and its z score from the Wilson-Hilferty approximation
+    n = counts.shape[0]
+    expected = counts.sum() / (n * n)
+    statistic = float(((counts - expected) ** 2).sum() / expected)
+    df = (n - 1) ** 2
+    z = ((statistic / df) ** (1 / 3) - (1 - 2 / (9 * df))) / (2 / (9 * df)) ** 0.5
+    return statistic, z
+
+
+def count_positions(perms, counts):
+    # perms[i, p] is the card at position p of shuffle i
+    n = perms.shape[1]
+    index = perms * n + np.arange(n)
+    counts += np.bincount(index.ravel(), minlength=n * n).reshape(n, n)
+
+
+def report(name, rate, unit, counts):
+    statistic, z = chi_square(counts)
+    expected = counts.sum() / counts.size
+    bias = np.abs(counts - expected).max() / expected
+    result = "pass" if z < CRITICAL_Z else "FAIL"
+    print(
+        f"  {name:18} {rate:12.0f} {unit}  chi2={statistic:9.1f}  z={z:7.2f}"
+        f"  max bias={bias:6.2%}  {result}"
+    )
+
+
+def test_cards(name, shuffler):
+    cards = Cards(64, 90, palette, shuffler=shuffler)
+    n = len(cards.all_cards)
+    index = {id(card): i for i, card in enumerate(cards.all_cards)}
+
+    deals = 0
+    start = perf_counter()
+    while perf_counter() - start < DURATION:
+        cards.shuffle()
+        cards.draw(n)
+        deals += 1
+    rate = deals / (perf_counter() - start)
+
+    order = np.empty((CARDS_SHUFFLES, n), dtype=np.intp)
+    for i in range(CARDS_SHUFFLES):
+        cards.shuffle()
+        order[i] = [index[id(card)] for card in cards.draw(n)]
+    counts = np.zeros((n, n), dtype=np.int64)
+    count_positions(order, counts)
+    report(name, rate, "deals/s   ", counts)
+
+
+def test_vectorized(name, make_permutations, n=52):
+    rng = np.random.default_rng()
+    counts = np.zeros((n, n), dtype=np.int64)
+    elapsed = 0.0
+    for _ in range(VECTORIZED_SHUFFLES // CHUNK):
+        start = perf_counter()
+        perms = make_permutations(CHUNK, n, rng=rng)
+        elapsed += perf_counter() - start
+        count_positions(perms, counts)
+    report(name, VECTORIZED_SHUFFLES / elapsed, "shuffles/s", counts)
+
+
+print(f"Cards strategies, {CARDS_SHUFFLES} shuffles each:")
+for name, shuffler in CARDS_STRATEGIES:
+    test_cards(name, shuffler)
+
+print(f"Vectorized models, {VECTORIZED_SHUFFLES} shuffles each:")
+for name, make_permutations in VECTORIZED_STRATEGIES:
+    test_vectorized(name, make_permutations)
@@ -0,0 +1,45 @@
+"""
+Table Benchmark - measures how many Cards instances (tables) can be created per second
+for full, multi-deck and partial decks.  No display is needed.
+"""
+
+from graphics.palettes import get_palette
+from playing_cards import Cards, SUITS, RANKS, NINE, TEN, JACK, QUEEN, KING, ACE
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:
+    from time import time
+
+    def ticks_ms():
+        return int(time() * 1000)
+
+    def ticks_diff(end, start):
+        return end - start
+
+
+palette = get_palette(color_depth=4)
+
+NINE_TO_ACE = [NINE, TEN, JACK, QUEEN, KING, ACE]
+
+DECKS = [
+    ("Standard", RANKS, 1),
+    ("6 deck shoe", RANKS, 6),
+    ("Pinochle", NINE_TO_ACE, 2),
+    ("Euchre", NINE_TO_ACE, 1),
+]
+
+DURATION_MS = 2000
+
+
+def tables_per_second(ranks, num_decks):
+    count = 0
+    start = ticks_ms()
+    while (elapsed := ticks_diff(ticks_ms(), start)) < DURATION_MS:
+        Cards(64, 90, palette, num_decks=num_decks, suits=SUITS, ranks=ranks)
+        count += 1
+    return count * 1000 // elapsed
+
+
+for name, ranks, num_decks in DECKS:
+    print(f"{name}: {tables_per_second(ranks, num_decks)} tables/s")
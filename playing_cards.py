@@ -10,6 +10,17 @@ import random
 from graphics import shapes
 from graphics.binfont import text16
 
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    from time import perf_counter_ns
+
+    def ticks_us():
+        return perf_counter_ns() // 1000
+
+    def ticks_diff(end, start):
+        return end - start
+
 
 HEARTS = "Hearts"
 DIAMONDS = "Diamonds"
@@ -34,6 +45,9 @@ ACE, TWO, THREE, FOUR, FIVE, SIX, SEVEN, EIGHT, NINE, TEN, JACK, QUEEN, KING = (
 )
 RANKS = [ACE, TWO, THREE, FOUR, FIVE, SIX, SEVEN, EIGHT, NINE, TEN, JACK, QUEEN, KING]
 
+# Events passed to listeners added with Cards.add_listener
+SHUFFLE, DRAW, PLACE, PLACE_TOP, FLIP, HIDE, REVEAL, DISCARD, CLEAR, ERASE = range(10)
+
 
 def sign(x):
     if x < 0:
@@ -43,14 +57,197 @@ def sign(x):
     return 0
 
 
+def fisher_yates(cards):
+    # Shuffles a list in place
+    for i in range(len(cards) - 1, 0, -1):
+        j = random.randrange(i + 1)
+        cards[i], cards[j] = cards[j], cards[i]
+
+
+def riffle(cards, times=7):
+    # Shuffles a list in place with riffle shuffles as modeled by Gilbert, Shannon and Reeds:
+    # cut the deck binomially, then drop cards from each half in proportion to its size
+    n = len(cards)
+    for _ in range(times):
+        cut = 0
+        for _ in range(n):
+            cut += random.getrandbits(1)
+        left, right = cards[:cut], cards[cut:]
+        i = j = 0
+        for k in range(n):
+            remaining_left = cut - i
+            if random.randrange(n - k) < remaining_left:
+                cards[k] = left[i]
+                i += 1
+            else:
+                cards[k] = right[j]
+                j += 1
+
+
+class Stats:
+    """
+    Call counts and wall time for the hot paths of Cards, Pile and rendering.
+    Only one in every sample_every calls to a timed operation is timed; all are counted.
+    """
+
+    def __init__(self, sample_every=1):
+        self._sample_every = sample_every
+        self._calls = {}  # name -> number of calls
+        self._samples = {}  # name -> number of timed calls
+        self._times = {}  # name -> microseconds spent in timed calls
+        self._phases = {}  # phase name -> {"entries", "time_us", "calls"}
+        self._wrappers = {}  # name -> timed wrapper of a drawing function
+
+    def count(self, name, n=1):
+        self._calls[name] = self._calls.get(name, 0) + n
+
+    def start(self, name):
+        # Count a call and return its start time, or None if it isn't sampled
+        calls = self._calls[name] = self._calls.get(name, 0) + 1
+        if calls % self._sample_every:
+            return None
+        return ticks_us()
+
+    def stop(self, name, start):
+        if start is not None:
+            self._add_time(name, ticks_diff(ticks_us(), start))
+
+    def lap(self, name, start):
+        # Count a stage and time it from start; returns the start time for the next stage
+        self._calls[name] = self._calls.get(name, 0) + 1
+        if start is None:
+            return None
+        now = ticks_us()
+        self._add_time(name, ticks_diff(now, start))
+        return now
+
+    def timed(self, name, func):
+        # Returns a wrapper of func that counts and times its calls under name
+        wrapper = self._wrappers.get(name)
+        if wrapper is None or wrapper.func is not func:
+            wrapper = self._wrappers[name] = _Timed(self, name, func)
+        return wrapper
+
+    def _add_time(self, name, elapsed):
+        self._samples[name] = self._samples.get(name, 0) + 1
+        self._times[name] = self._times.get(name, 0) + elapsed
+
+    def phase(self, name):
+        # Context manager that attributes wall time and calls to a phase of the game
+        return _Phase(self, name)
+
+    def reset(self):
+        self._calls.clear()
+        self._samples.clear()
+        self._times.clear()
+        self._phases.clear()
+
+    def snapshot(self):
+        # time_us is estimated from the sampled calls when sample_every > 1
+        counters = {}
+        for name, calls in self._calls.items():
+            samples = self._samples.get(name, 0)
+            time_us = self._times.get(name, 0)
+            counters[name] = {
+                "calls": calls,
+                "samples": samples,
+                "time_us": time_us * calls // samples if samples else 0,
+            }
+        phases = {}
+        for name, phase in self._phases.items():
+            phases[name] = {
+                "entries": phase["entries"],
+                "time_us": phase["time_us"],
+                "calls": dict(phase["calls"]),
+            }
+        return {"counters": counters, "phases": phases}
+
+    def to_json(self):
+        import json
+
+        return json.dumps(self.snapshot())
+
+
+class _Timed:
+    def __init__(self, stats, name, func):
+        self._stats = stats
+        self._name = name
+        self.func = func
+
+    def __call__(self, *args, **kwargs):
+        t = self._stats.start(self._name)
+        result = self.func(*args, **kwargs)
+        self._stats.stop(self._name, t)
+        return result
+
+
+class _Phase:
+    def __init__(self, stats, name):
+        self._stats = stats
+        self._name = name
+
+    def __enter__(self):
+        self._calls = dict(self._stats._calls)
+        self._start = ticks_us()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = ticks_diff(ticks_us(), self._start)
+        phases = self._stats._phases
+        phase = phases.get(self._name)
+        if phase is None:
+            phase = phases[self._name] = {"entries": 0, "time_us": 0, "calls": {}}
+        phase["entries"] += 1
+        phase["time_us"] += elapsed
+        calls = phase["calls"]
+        for name, n in self._stats._calls.items():
+            if delta := n - self._calls.get(name, 0):
+                calls[name] = calls.get(name, 0) + delta
+
+
+class _NoPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_stats = None  # The Stats instance while instrumentation is enabled
+_no_phase = _NoPhase()
+
+
+def enable_stats(sample_every=1):
+    global _stats
+    _stats = Stats(sample_every)
+    return _stats
+
+
+def disable_stats():  # Returns the Stats that were being collected
+    global _stats
+    stats, _stats = _stats, None
+    return stats
+
+
+def get_stats():
+    return _stats
+
+
+def phase(name):
+    # Use as `with phase("deal"):`.  Does nothing if instrumentation is disabled.
+    return _stats.phase(name) if _stats else _no_phase
+
+
 class Card:
+    # Defaults until the card is rendered, so creating a card only sets its identity
+    _hidden = False
+    _position = None
+    _target = None
+
     def __init__(self, suit, rank, deck=None):
         self._suit = suit
         self._rank = rank
         self._deck = deck
-        self._hidden = False
-        self._position = None
-        self._target = None
 
     def __str__(self):
         return f"{self.rank} of {self.suit}"
@@ -94,34 +291,46 @@ class Card:
     def hidden(self):
         return self._hidden
 
+    @hidden.setter
+    def hidden(self, value):  # Changes the state only; use hide, reveal or flip to redraw
+        self._hidden = value
+
     def update(self):
         return self.render(self._target, self.position[0], self.position[1], self._hidden)
 
     def hide(self):
         self._hidden = True
+        self._deck.notify(HIDE, self)
         return self.update()
 
     def reveal(self):
         self._hidden = False
+        self._deck.notify(REVEAL, self)
         return self.update()
 
     def flip(self):
         self._hidden = not self._hidden
+        self._deck.notify(FLIP, self)
         return self.update()
 
     def discard(self):
         self._deck.discard(self)
 
     def erase(self):
-        return self._deck.erase(self._target, self.position[0], self.position[1])
+        self._deck.notify(ERASE, self)
+        return self._deck.erase(self._target, self.position[0], self.position[1], self)
 
     def hit_test(self, x, y):
-        if self.position is None:
-            return False
-        return (
+        st = _stats
+        if st:
+            t = st.start("hit_test")
+        hit = self.position is not None and (
             self.position[0] <= x < self.position[0] + self._deck.width
             and self.position[1] <= y < self.position[1] + self._deck.height
         )
+        if st:
+            st.stop("hit_test", t)
+        return hit
 
     @property
     def position(self):
@@ -140,6 +349,65 @@ class Card:
         self._hidden = hidden
 
 
+class DeckTemplate:
+    """
+    The immutable parts of a deck, shared by every Cards instance with the same
+    suits, ranks and number of decks.  Use deck_template() to get one.
+    """
+
+    def __init__(self, suits, ranks, num_decks):
+        self._suits = tuple(suits)
+        self._ranks = tuple(ranks)
+        self._num_decks = num_decks
+        # (suit, rank) of each card in Cards.all_cards order
+        self._identities = tuple(
+            (suit, rank)
+            for suit in self._suits
+            for rank in self._ranks
+            for _ in range(num_decks)
+        )
+        self._rank_keys = {}  # tuple(rank order) -> {rank: index}
+
+    @property
+    def suits(self):
+        return self._suits
+
+    @property
+    def ranks(self):
+        return self._ranks
+
+    @property
+    def num_decks(self):
+        return self._num_decks
+
+    @property
+    def identities(self):
+        return self._identities
+
+    def __len__(self):
+        return len(self._identities)
+
+    def rank_keys(self, rank_order):
+        # Returns {rank: index in rank_order}, for comparing ranks
+        key = tuple(rank_order)
+        keys = self._rank_keys.get(key)
+        if keys is None:
+            keys = self._rank_keys[key] = {rank: i for i, rank in enumerate(key)}
+        return keys
+
+
+_templates = {}  # (suits, ranks, num_decks) -> DeckTemplate
+
+
+def deck_template(suits=SUITS, ranks=RANKS, num_decks=1):
+    # Returns the shared DeckTemplate for a deck, creating it the first time
+    key = (tuple(suits), tuple(ranks), num_decks)
+    template = _templates.get(key)
+    if template is None:
+        template = _templates[key] = DeckTemplate(*key)
+    return template
+
+
 class Pile:
     def __init__(
         self,
@@ -151,8 +419,10 @@ class Pile:
         layout_horizontal=True,
         layout_direction=0,
         layout_offset=0,
+        pile_id=0,
     ):
         self._target = target
+        self._pile_id = pile_id  # Identifies the pile to listeners, such as a hand history log
         self._start_x = self._next_x = start_x
         self._start_y = self._next_y = start_y
         self._top_card_hidden = top_card_hidden
@@ -165,11 +435,16 @@ class Pile:
         self._in_pile = []
 
     def clear(self):  # Remove all cards from the pile
+        if self._in_pile:
+            self._in_pile[0]._deck.notify(CLEAR, None, self)
         self._in_pile.clear()
         self._next_x = self._start_x
         self._next_y = self._start_y
 
     def place(self, card, top_card=False):  # Place a card on the pile
+        st = _stats
+        if st:
+            t = st.start("place")
         self._in_pile.append(card)
 
         if top_card:
@@ -177,13 +452,21 @@ class Pile:
         else:
             hidden = self._other_cards_hidden
 
+        card._deck.notify(PLACE_TOP if top_card else PLACE, card, self)
         dirty = card.render(self._target, self._next_x, self._next_y, hidden=hidden)
         if self._layout_horizontal == True:
             self._next_x += self._layout_direction * self._layout_offset
         else:
             self._next_y += self._layout_direction * self._layout_offset
+        if st:
+            st.stop("place", t)
         return dirty
 
+    def erase_all(self):
+        # Erase the cards in the pile from the top down, so save-under restores each
+        # card's background before the card beneath it is erased.  Returns the dirty areas.
+        return [card.erase() for card in reversed(self._in_pile) if card.position is not None]
+
     def pull(self, card):  # Remove a card from the pile
         pass
 
@@ -197,6 +480,10 @@ class Pile:
     def in_pile(self):
         return list(self._in_pile)
 
+    @property
+    def pile_id(self):
+        return self._pile_id
+
 
 class Hand(Pile):
     def __init__(self, is_dealer=False, **kwargs):
@@ -255,8 +542,22 @@ class Cards(Pile):
         table_color=None,
         suits=SUITS,
         ranks=RANKS,
+        table_id=0,
+        save_under=False,
+        shuffler=None,
     ):
+        # shuffler(list) shuffles the deck in place when it is shuffled, such as fisher_yates or
+        # riffle, and cards are then dealt from the end.  If None, each draw picks a random card.
+        self._shuffler = shuffler
+        # Save what is beneath each card so erase can restore it; see _save_under_card
+        self._save_under = save_under
+        # Card -> (target, draw_x, draw_y, x, y, width, height, buffer) of what is beneath it
+        self._saved = {}
+        self._buffer_pool = {}  # Target -> full size save-under buffers that may be reused
+        self._backend = None  # Renders and erases cards instead of MPDisplay if set
         self.set_dimensions(width, height)
+        self._table_id = table_id
+        self._listeners = []
         self._palette = palette
         self._num_decks = num_decks
         self._table_color = table_color if table_color is not None else palette.GREEN
@@ -273,12 +574,10 @@ class Cards(Pile):
             SPADES: palette.BLACK,
         }
 
-        self._all_cards = [
-            Card(suit, rank, self)
-            for suit in self._suits
-            for rank in self._ranks
-            for _ in range(num_decks)
-        ]
+        self._template = deck_template(suits, ranks, num_decks)
+        self._all_cards = [Card(suit, rank, self) for suit, rank in self._template.identities]
+        # {rank: index in _cmp_rank_order} for compare; call set_rank_order to change the order
+        self._rank_keys = self._template.rank_keys(self._cmp_rank_order)
         self._in_deck = []
         self._in_play = []
         self._in_discard = []
@@ -318,6 +617,10 @@ class Cards(Pile):
         )
         self._y_positions.sort()
 
+        # Save-under buffers are sized to the card, so they can't be reused after a resize
+        self._saved.clear()
+        self._buffer_pool.clear()
+
     @property
     def width(self):
         return self._width
@@ -350,52 +653,162 @@ class Cards(Pile):
     def all_cards(self):
         return self._all_cards
 
+    @property
+    def template(self):
+        return self._template
+
+    @property
+    def table_id(self):
+        return self._table_id
+
+    @property
+    def backend(self):
+        return self._backend
+
+    @backend.setter
+    def backend(self, value):
+        # An object with render(card, target, x, y, hidden) and erase(target, x, y, card)
+        # methods, such as playing_cards_numpy.ArrayRenderer, or None to draw with MPDisplay
+        self._backend = value
+
+    @property
+    def shuffler(self):
+        return self._shuffler
+
+    @shuffler.setter
+    def shuffler(self, value):  # Takes effect at the next shuffle
+        self._shuffler = value
+
+    @property
+    def save_under(self):
+        return self._save_under
+
+    @save_under.setter
+    def save_under(self, value):
+        self._save_under = value
+        if not value:
+            self._release_saved()
+
     def __len__(self):
         return len(self._in_deck)
 
+    def add_listener(self, listener):
+        # listener(event, card, pile) is called on SHUFFLE, DRAW, PLACE, PLACE_TOP, FLIP, HIDE,
+        # REVEAL, DISCARD, ERASE and, when a pile holding its cards is cleared, CLEAR
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def notify(self, event, card=None, pile=None):
+        for listener in self._listeners:
+            listener(event, card, pile)
+
     def shuffle(self):
         # Move all cards back into the deck
         self._in_deck = [card for card in self._all_cards]
+        self._deck_shuffled = self._shuffler is not None
+        if self._deck_shuffled:
+            self._shuffler(self._in_deck)
         self._in_play.clear()
         self._in_discard.clear()
+        self._release_saved()
+        self.notify(SHUFFLE)
 
     def discard(self, card):
         self._in_play.remove(card)
         self._in_discard.append(card)
+        self.notify(DISCARD, card)
 
     def draw_one(self):
-        if self._in_deck:
-            card = random.choice(self._in_deck)
-            self._in_deck.remove(card)
-            self._in_play.append(card)
-            return card
-        else:
+        if not self._in_deck:
             raise ValueError("No cards left in the deck")
+        st = _stats
+        if st:
+            t = st.start("draw_one")
+        if self._deck_shuffled:
+            card = self.draw_card(self._in_deck[-1])
+        else:
+            card = self.draw_card(random.choice(self._in_deck))
+        if st:
+            st.stop("draw_one", t)
+        return card
+
+    def draw_card(self, card):  # Draw a specific card from the deck
+        if self._in_deck and self._in_deck[-1] is card:
+            self._in_deck.pop()
+        else:
+            self._in_deck.remove(card)
+        self._in_play.append(card)
+        self.notify(DRAW, card)
+        return card
 
     def draw(self, quantity=1):
         return [self.draw_one() for _ in range(quantity)]
 
-    def erase(self, target, x, y):
+    def erase(self, target, x, y, card=None):
+        st = _stats
+        if st:
+            t = st.start("erase")
+        if self._backend is not None:
+            dirty = self._backend.erase(target, x, y, card)
+            if st:
+                st.stop("erase", t)
+            return dirty
         draw_x = x + self._x_offset
         draw_y = y + self._y_offset
 
-        return target.fill_rect(
-            draw_x,
-            draw_y,
-            self._draw_width + 1,
-            self._draw_height + 1,
-            self._table_color,
-        )
+        dirty = self._restore_beneath(card, target, draw_x, draw_y)
+        if dirty is None:
+            dirty = target.fill_rect(
+                draw_x,
+                draw_y,
+                self._draw_width + 1,
+                self._draw_height + 1,
+                self._table_color,
+            )
+
+        if st:
+            st.stop("erase", t)
+        return dirty
 
     def render(self, card, target, x, y, hidden=True):
+        st = _stats
+        if st is None:
+            if self._backend is not None:
+                return self._backend.render(card, target, x, y, hidden)
+            return self._render(card, target, x, y, hidden, None, None)
+        t = st.start("render")
+        if self._backend is not None:
+            dirty = self._backend.render(card, target, x, y, hidden)
+        else:
+            dirty = self._render(card, target, x, y, hidden, st, t)
+        st.stop("render", t)
+        return dirty
+
+    def _render(self, card, target, x, y, hidden, st, t):
+        # st is the Stats instance if enabled and t is the start time if this call is sampled
         draw_x = x + self._x_offset
         draw_y = y + self._y_offset
+        if st:
+            round_rect = st.timed("round_rect", shapes.round_rect)
+            text = st.timed("text16", text16)
+        else:
+            round_rect = shapes.round_rect
+            text = text16
+
+        # Save what is beneath the card, unless it is being redrawn in place
+        if self._save_under:
+            self._save_beneath(card, target, draw_x, draw_y)
 
         # Save the state of the card
         card.save_state(target, x, y, hidden)
 
+        if st:
+            t = st.lap("render.save", t)
+
         # Draw the card background
-        dirty = shapes.round_rect(
+        dirty = round_rect(
             target,
             draw_x,
             draw_y,
@@ -405,9 +818,11 @@ class Cards(Pile):
             self._bg_color,
             True,
         )
+        if st:
+            t = st.lap("render.background", t)
 
         # Draw the card border
-        shapes.round_rect(
+        round_rect(
             target,
             draw_x,
             draw_y,
@@ -417,10 +832,12 @@ class Cards(Pile):
             self._border_color,
             False,
         )
+        if st:
+            t = st.lap("render.border", t)
 
         if hidden:
             # Draw the card back
-            shapes.round_rect(
+            round_rect(
                 target,
                 draw_x + 2,
                 draw_y + 2,
@@ -430,88 +847,152 @@ class Cards(Pile):
                 self._back_color,
                 True,
             )
+            if st:
+                st.lap("render.back", t)
             return
 
-        # Draw the card value in the top left corner
-        text16(
-            target,
-            card.value,
-            draw_x + self._x_positions[0] - len(card.value) * self._lfw // 2,
-            draw_y + self._y_positions[0] - self._lfh // 2,
-            self._suit_colors[card.suit],
-        )
+        # Draw the card values and suit glyphs, then a large letter on face cards
+        color = self._suit_colors[card.suit]
+        glyphs, face = self._layout(card)
+        for string, dx, dy, scale, inverted in glyphs:
+            text(target, string, draw_x + dx, draw_y + dy, color, scale=scale, inverted=inverted)
+        if st:
+            t = st.lap("render.glyph", t)
 
-        # Draw the card value in the bottom right corner
-        text16(
-            target,
-            card.value,
-            draw_x + self._x_positions[4] - len(card.value) * self._lfw // 2,
-            draw_y + self._y_positions[6] - self._lfh // 2,
-            self._suit_colors[card.suit],
-            inverted=True,
-        )
+        # Small cards only have their corners drawn
+        if self._is_small:
+            return
 
-        # Draw the suit glyph in the top left corner
-        text16(
-            target,
-            self._suit_glyphs[card.suit],
-            draw_x + self._x_positions[0] - self._sfw // 2,
-            draw_y + self._y_positions[0] + self._lfh // 2,
-            self._suit_colors[card.suit],
-        )
+        for string, dx, dy, scale, inverted in face:
+            text(target, string, draw_x + dx, draw_y + dy, color, scale=scale, inverted=inverted)
+        if st and face:
+            st.lap("render.face", t)
 
-        # Draw the suit glyph in the bottom right corner
-        text16(
-            target,
-            self._suit_glyphs[card.suit],
-            draw_x + self._x_positions[4] - self._sfw // 2,
-            draw_y + self._y_positions[6] - self._lfh - self._sfh // 2,
-            self._suit_colors[card.suit],
-            inverted=True,
-        )
+        return dirty
+
+    def _layout(self, card):
+        # Returns the text drawn on the face of a card as two lists of
+        # (text, x, y, scale, inverted), relative to the top left of the drawing area:
+        # the card values and suit glyphs, then the large letter on face cards
+        value = card.value
+        glyph = self._suit_glyphs[card.suit]
+        x_positions = self._x_positions
+        y_positions = self._y_positions
+        lfw, lfh, sfw, sfh = self._lfw, self._lfh, self._sfw, self._sfh
+        glyphs = [
+            # The card value in the top left and bottom right corners
+            (value, x_positions[0] - len(value) * lfw // 2, y_positions[0] - lfh // 2, 1, False),
+            (value, x_positions[4] - len(value) * lfw // 2, y_positions[6] - lfh // 2, 1, True),
+            # The suit glyph in the top left and bottom right corners
+            (glyph, x_positions[0] - sfw // 2, y_positions[0] + lfh // 2, 1, False),
+            (glyph, x_positions[4] - sfw // 2, y_positions[6] - lfh - sfh // 2, 1, True),
+        ]
+        face = []
 
         # Skip drawing the suit glyph if the cards are small
         if self._is_small:
-            return
+            return glyphs, face
 
-        # Draw the suit glyph on the grid (on Ace through 10)
+        # The suit glyph on the grid (on Ace through 10)
         for x_pos, y_pos in self._positions[card.rank]:
-            text16(
-                target,
-                self._suit_glyphs[card.suit],
-                draw_x + self._x_positions[x_pos] - self._lfs * self._lfw // 2,
-                draw_y + self._y_positions[y_pos] - self._lfs * self._lfh // 2,
-                self._suit_colors[card.suit],
-                scale=self._lfs,
-                inverted=y_pos > 3,
+            glyphs.append(
+                (
+                    glyph,
+                    x_positions[x_pos] - self._lfs * self._lfw // 2,
+                    y_positions[y_pos] - self._lfs * self._lfh // 2,
+                    self._lfs,
+                    y_pos > 3,
+                )
             )
 
-        # Draw a large letter on face cards instead of a graphic
+        # A large letter on face cards instead of a graphic
         if card.rank in ["Jack", "Queen", "King"]:
-            text16(
-                target,
-                card.value[0],
-                draw_x + self._x_positions[2] - self._fcs * self._lfw // 2,
-                draw_y + self._y_positions[3] - self._fcs * self._lfh // 2,
-                self._suit_colors[card.suit],
-                scale=self._fcs,
+            face.append(
+                (
+                    value[0],
+                    x_positions[2] - self._fcs * self._lfw // 2,
+                    y_positions[3] - self._fcs * self._lfh // 2,
+                    self._fcs,
+                    False,
+                )
             )
-
+        return glyphs, face
+
+    def _save_beneath(self, card, target, x, y):
+        # Save the area beneath a card about to be drawn at x, y, unless it is already there.
+        # Also used by backends.
+        saved = self._saved.get(card)
+        if saved is None or saved[:3] != (target, x, y):
+            if saved is not None:
+                self._pool_buffer(self._saved.pop(card))
+            saved = self._save_under_card(target, x, y)
+            if saved is not None:
+                self._saved[card] = saved
+
+    def _restore_beneath(self, card, target, x, y):
+        # Restore what was beneath a card drawn at x, y and return the dirty area, or
+        # None if it wasn't saved.  Overlapping cards must be erased in the reverse of
+        # the order they were rendered, as Pile.erase_all does.  Also used by backends.
+        saved = self._saved.pop(card, None)
+        if saved is None:
+            return None
+        dirty = None
+        if saved[:3] == (target, x, y):
+            dirty = target.blit_rect(saved[7], *saved[3:7])
+        self._pool_buffer(saved)
         return dirty
 
+    def _save_under_card(self, target, x, y):
+        # Read the card area, clipped to the target, in one call.  Targets need
+        # read_rect(x, y, w, h, buffer=None) returning a buffer that their
+        # blit_rect(buffer, x, y, w, h) accepts.
+        if not (hasattr(target, "read_rect") and hasattr(target, "blit_rect")):
+            raise TypeError("save_under needs a target with read_rect and blit_rect")
+        x0, y0 = max(x, 0), max(y, 0)
+        width = min(x + self._draw_width + 1, target.width) - x0
+        height = min(y + self._draw_height + 1, target.height) - y0
+        if width <= 0 or height <= 0:
+            return None
+        buffer = None
+        pool = self._buffer_pool.get(target)
+        if pool and (width, height) == (self._draw_width + 1, self._draw_height + 1):
+            buffer = pool.pop()
+        buffer = target.read_rect(x0, y0, width, height, buffer)
+        return (target, x, y, x0, y0, width, height, buffer)
+
+    def _pool_buffer(self, saved):
+        # Keep a buffer for reuse if it is the size of a whole card
+        if (saved[5], saved[6]) == (self._draw_width + 1, self._draw_height + 1):
+            pool = self._buffer_pool.get(saved[0])
+            if pool is None:
+                pool = self._buffer_pool[saved[0]] = []
+            pool.append(saved[7])
+
+    def _release_saved(self):
+        for saved in self._saved.values():
+            self._pool_buffer(saved)
+        self._saved.clear()
+
+    def set_rank_order(self, rank_order):  # Change the order ranks are compared in
+        self._cmp_rank_order = rank_order
+        self._rank_keys = self._template.rank_keys(rank_order)
+
     def compare(self, card1, card2, comparison=0):
+        st = _stats
+        if st:
+            t = st.start("compare")
+        result = None
         if self._cmp_suit_order:
             if suit1_score := self._cmp_suit_order.count(card1.suit):
                 suit1_score = 4 - self._cmp_suit_order.index(card1.suit)
             if suit2_score := self._cmp_suit_order.count(card2.suit):
                 suit2_score = 4 - self._cmp_suit_order.index(card1.suit)
             if (suit_comparison := sign(suit1_score - suit2_score)) != 0:
-                return suit_comparison == comparison
-        return (
-            sign(
-                self._cmp_rank_order.index(card1.rank)
-                - self._cmp_rank_order.index(card2.rank)
-            )
-            == comparison
-        )
+                result = suit_comparison == comparison
+        if result is None:
+            rank_keys = self._rank_keys
+            result = sign(rank_keys[card1.rank] - rank_keys[card2.rank]) == comparison
+        if st:
+            st.stop("compare", t)
+        return result
 
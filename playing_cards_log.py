@@ -0,0 +1,210 @@
+# SPDX-FileCopyrightText: 2024 Brad Barnett
+#
+# SPDX-License-Identifier: MIT
+"""
+playing_cards_log.py - Binary hand history for playing_cards.
+HandLog records what a Cards instance does as fixed-width records.  HandLogReader
+reads them back, optionally as a NumPy structured array, and can replay them
+into a Cards instance to reproduce a table.
+
+Each record is 12 bytes, little-endian:
+    table id (uint16), event (uint8), pad (uint8), card id (uint16),
+    pile id (uint16), timestamp in ms (uint32)
+Card and pile ids of 0xFFFF mean the event has no card or pile, so piles
+shouldn't use that id.
+"""
+
+import struct
+from playing_cards import SHUFFLE, DRAW, PLACE, PLACE_TOP, FLIP, HIDE, REVEAL, DISCARD, CLEAR, ERASE
+
+try:
+    from time import ticks_ms
+except ImportError:
+    from time import time
+
+    def ticks_ms():
+        return int(time() * 1000) & 0xFFFFFFFF
+
+
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+RECORD_FORMAT = "<HBxHHI"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+NO_CARD = 0xFFFF  # Card id recorded for events that don't involve a card, such as SHUFFLE
+NO_PILE = 0xFFFF  # Pile id recorded for events that don't involve a pile, such as DRAW
+
+if np is not None:
+    RECORD_DTYPE = np.dtype(
+        [
+            ("table", "<u2"),
+            ("event", "u1"),
+            ("pad", "u1"),
+            ("card", "<u2"),
+            ("pile", "<u2"),
+            ("time", "<u4"),
+        ]
+    )
+else:
+    RECORD_DTYPE = None
+
+
+class HandLog:
+    def __init__(self, stream, buffer_records=256):
+        # stream may be a file name or a binary stream opened for writing
+        if isinstance(stream, str):
+            self._stream = open(stream, "ab")
+            self._owns_stream = True
+        else:
+            self._stream = stream
+            self._owns_stream = False
+        self._buffer = bytearray(buffer_records * RECORD_SIZE)
+        self._view = memoryview(self._buffer)
+        self._used = 0
+        self._decks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def attach(self, cards):  # Start recording a Cards instance
+        card_ids = {id(card): i for i, card in enumerate(cards.all_cards)}
+        table_id = cards.table_id
+
+        def listener(event, card, pile):
+            self.record(
+                table_id,
+                event,
+                NO_CARD if card is None else card_ids[id(card)],
+                NO_PILE if pile is None else pile.pile_id,
+            )
+
+        cards.add_listener(listener)
+        self._decks.append((cards, listener))
+
+    def detach(self, cards=None):  # Stop recording one or all Cards instances
+        for deck in list(self._decks):
+            if cards is None or deck[0] is cards:
+                deck[0].remove_listener(deck[1])
+                self._decks.remove(deck)
+
+    def record(self, table_id, event, card_id=NO_CARD, pile_id=NO_PILE):
+        if self._used == len(self._buffer):
+            self.flush()
+        struct.pack_into(
+            RECORD_FORMAT,
+            self._buffer,
+            self._used,
+            table_id,
+            event,
+            card_id,
+            pile_id,
+            ticks_ms(),
+        )
+        self._used += RECORD_SIZE
+
+    def flush(self):  # Write all buffered records in one call
+        if self._used:
+            self._stream.write(self._view[: self._used])
+            self._used = 0
+        if hasattr(self._stream, "flush"):
+            self._stream.flush()
+
+    def close(self):
+        self.detach()
+        self.flush()
+        if self._owns_stream:
+            self._stream.close()
+
+
+class HandLogReader:
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        if mmap is not None:
+            try:
+                self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # An empty file can't be mapped
+                self._data = b""
+        else:
+            self._data = self._file.read()
+        self._view = memoryview(self._data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self._data) // RECORD_SIZE
+
+    def __iter__(self):
+        # Yields (table_id, event, card_id, pile_id, timestamp) tuples
+        unpack_from = struct.unpack_from
+        for offset in range(0, len(self) * RECORD_SIZE, RECORD_SIZE):
+            yield unpack_from(RECORD_FORMAT, self._view, offset)
+
+    def array(self):
+        # Returns the records as a NumPy structured array backed by the mapped file
+        if np is None:
+            raise ImportError("numpy is required for HandLogReader.array()")
+        return np.frombuffer(self._view, dtype=RECORD_DTYPE, count=len(self))
+
+    def replay(self, cards, piles=None, table_id=None):
+        # Apply the records for a table to cards.  piles maps pile ids to Pile
+        # instances; if given, placed cards are rendered to those piles.
+        if table_id is None:
+            table_id = cards.table_id
+        all_cards = cards.all_cards
+        for table, event, card_id, pile_id, _ in self:
+            if table != table_id:
+                continue
+            card = None if card_id == NO_CARD else all_cards[card_id]
+            if event == SHUFFLE:
+                cards.shuffle()
+            elif event == DRAW:
+                cards.draw_card(card)
+            elif event == DISCARD:
+                cards.discard(card)
+            elif event == PLACE or event == PLACE_TOP:
+                if piles is not None:
+                    piles[pile_id].place(card, top_card=event == PLACE_TOP)
+            elif event == CLEAR:
+                if piles is not None:
+                    piles[pile_id].clear()
+            elif event == ERASE:
+                if card.target is not None:
+                    card.erase()
+            elif event == FLIP:
+                if card.target is not None:  # Rendered, so redraw it
+                    card.flip()
+                else:
+                    card.hidden = not card.hidden
+            elif event == HIDE:
+                if card.target is not None:
+                    card.hide()
+                else:
+                    card.hidden = True
+            elif event == REVEAL:
+                if card.target is not None:
+                    card.reveal()
+                else:
+                    card.hidden = False
+
+    def close(self):
+        # Any arrays returned by array() must be released before closing
+        if hasattr(self._view, "release"):
+            self._view.release()
+        if mmap is not None and not isinstance(self._data, bytes):
+            self._data.close()
+        self._file.close()
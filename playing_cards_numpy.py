@@ -0,0 +1,256 @@
+# SPDX-FileCopyrightText: 2024 Brad Barnett
+#
+# SPDX-License-Identifier: MIT
+"""
+playing_cards_numpy.py - Offscreen NumPy rendering for playing_cards.
+ArrayRenderer draws cards into NumPy arrays instead of MPDisplay targets.  Each
+card face and the card back are rasterized once into a sprite using vectorized
+rounded rectangle masks and a glyph atlas built from the same layout as
+Cards.render, so drawing a card is a single masked array copy.  Whole decks and
+tables can be rendered in one call for thumbnails, snapshots and golden-image tests.
+
+    renderer = ArrayRenderer(cards)
+    cards.backend = renderer  # Optional, makes Card.render, flip, erase, etc. draw into arrays
+    sheet = renderer.render_sheet()
+    table = renderer.render_table([dealer, player1], 320, 480)
+"""
+
+import numpy as np
+from graphics.binfont import text16
+
+
+_atlas = {}  # (text, scale, inverted) -> boolean mask of the pixels text16 draws
+
+
+def glyph_mask(text, scale=1, inverted=False):
+    # Rasterize text once with text16 and keep the mask of the pixels it drew
+    key = (text, scale, inverted)
+    mask = _atlas.get(key)
+    if mask is None:
+        canvas = ArrayTarget(8 * scale * len(text), 16 * scale, dtype=np.uint8)
+        text16(canvas, text, 0, 0, 1, scale=scale, inverted=inverted)
+        mask = _atlas[key] = canvas.array != 0
+    return mask
+
+
+def round_rect_mask(width, height, radius, filled=True):
+    # Boolean mask of a rounded rectangle, computed for all pixels at once
+    radius = max(0, min(radius, (width - 1) // 2, (height - 1) // 2))
+    yy = np.arange(height)[:, None]
+    xx = np.arange(width)[None, :]
+    cx = np.clip(xx, radius, width - 1 - radius)
+    cy = np.clip(yy, radius, height - 1 - radius)
+    mask = (xx - cx) ** 2 + (yy - cy) ** 2 <= radius * radius
+    if not filled and width > 2 and height > 2:
+        mask[1:-1, 1:-1] &= ~round_rect_mask(width - 2, height - 2, radius - 1)
+    return mask
+
+
+def _copy(dest, src, where, x, y):
+    # Copy src into dest at x, y where the mask is True, clipped to dest
+    h, w = where.shape
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, dest.shape[1]), min(y + h, dest.shape[0])
+    if x0 < x1 and y0 < y1:
+        region = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+        np.copyto(dest[y0:y1, x0:x1], src[region], where=where[region])
+
+
+class Area:
+    """
+    The (x, y, w, h) rectangle a drawing method changed.  Adding two areas gives the
+    smallest area containing both, like MPDisplay's dirty areas.
+    """
+
+    def __init__(self, x, y, w, h):
+        self.x, self.y, self.w, self.h = x, y, w, h
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.w, self.h))
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"Area({self.x}, {self.y}, {self.w}, {self.h})"
+
+    def __add__(self, other):
+        if other is None:
+            return self
+        x, y = min(self.x, other.x), min(self.y, other.y)
+        x1 = max(self.x + self.w, other.x + other.w)
+        y1 = max(self.y + self.h, other.y + other.h)
+        return Area(x, y, x1 - x, y1 - y)
+
+    __radd__ = __add__
+
+
+class ArrayTarget:
+    """
+    A 2D array of color values with the subset of the MPDisplay target API used by
+    Cards and text16, plus read_rect and blit_rect for save-under.  Methods return
+    the Area they changed.
+    """
+
+    def __init__(self, width, height, color=0, dtype=np.uint16):
+        self.array = np.full((height, width), color, dtype=dtype)
+
+    @property
+    def width(self):
+        return self.array.shape[1]
+
+    @property
+    def height(self):
+        return self.array.shape[0]
+
+    def fill(self, color):
+        self.array[:] = color
+        return Area(0, 0, self.width, self.height)
+
+    def fill_rect(self, x, y, w, h, color):
+        self.array[max(y, 0) : max(y + h, 0), max(x, 0) : max(x + w, 0)] = color
+        return Area(x, y, w, h)
+
+    def hline(self, x, y, w, color):
+        return self.fill_rect(x, y, w, 1, color)
+
+    def vline(self, x, y, h, color):
+        return self.fill_rect(x, y, 1, h, color)
+
+    def pixel(self, x, y, color=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None if color is None else Area(x, y, 1, 1)
+        if color is None:
+            return int(self.array[y, x])
+        self.array[y, x] = color
+        return Area(x, y, 1, 1)
+
+    def blit(self, pixels, mask, x, y):
+        # Copy pixels where mask is True
+        _copy(self.array, pixels, mask, x, y)
+        return Area(x, y, mask.shape[1], mask.shape[0])
+
+    def read_rect(self, x, y, w, h, buffer=None):
+        # Returns a copy of a rectangle that lies within the target, in buffer if given
+        if buffer is None:
+            return self.array[y : y + h, x : x + w].copy()
+        np.copyto(buffer, self.array[y : y + h, x : x + w])
+        return buffer
+
+    def blit_rect(self, buffer, x, y, w, h):
+        # Writes a buffer from read_rect back
+        self.array[y : y + h, x : x + w] = buffer
+        return Area(x, y, w, h)
+
+
+class ArrayRenderer:
+    """
+    Renders the cards of a Cards instance into ArrayTargets.  Sprites cover a whole
+    card including its padding and are cached until the card size changes.
+    """
+
+    def __init__(self, cards, dtype=np.uint16):
+        self._cards = cards
+        self._dtype = dtype
+        self._size = None
+        self._sprites = {}  # (suit, rank) or None for the back -> (pixels, mask)
+
+    def _check_size(self):
+        size = (self._cards.width, self._cards.height)
+        if size != self._size:
+            self._size = size
+            self._sprites.clear()
+
+    def sprite(self, card, hidden=False):
+        # Returns (pixels, mask) arrays of the card face or back
+        self._check_size()
+        key = None if hidden else (card.suit, card.rank)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = self._sprites[key] = self._rasterize(card, hidden)
+        return sprite
+
+    def _rasterize(self, card, hidden):
+        cards = self._cards
+        canvas = ArrayTarget(cards.width, cards.height, dtype=self._dtype)
+        mask = np.zeros((cards.height, cards.width), dtype=bool)
+        x, y = cards._x_offset, cards._y_offset
+        w, h, r = cards._draw_width, cards._draw_height, cards._radius
+
+        def stamp(shape, dx, dy, color):
+            canvas.blit(np.full(shape.shape, color, self._dtype), shape, dx, dy)
+            _copy(mask, shape, shape, dx, dy)
+
+        # The card background and border
+        stamp(round_rect_mask(w, h, r), x, y, cards._bg_color)
+        stamp(round_rect_mask(w, h, r, filled=False), x, y, cards._border_color)
+
+        if hidden:
+            # The card back
+            stamp(round_rect_mask(w - 4, h - 4, r), x + 2, y + 2, cards._back_color)
+        else:
+            # The card values, suit glyphs and face letter
+            color = cards._suit_colors[card.suit]
+            glyphs, face = cards._layout(card)
+            for text, dx, dy, scale, inverted in glyphs + face:
+                stamp(glyph_mask(text, scale, inverted), x + dx, y + dy, color)
+        return canvas.array, mask
+
+    def render(self, card, target, x, y, hidden=True):
+        # Same signature as Cards.render, for use as Cards.backend
+        cards = self._cards
+        if cards.save_under:
+            cards._save_beneath(card, target, x + cards._x_offset, y + cards._y_offset)
+        card.save_state(target, x, y, hidden)
+        pixels, mask = self.sprite(card, hidden)
+        return target.blit(pixels, mask, x, y)
+
+    def erase(self, target, x, y, card=None):
+        # Restores what was beneath the card if Cards.save_under saved it
+        cards = self._cards
+        x += cards._x_offset
+        y += cards._y_offset
+        dirty = cards._restore_beneath(card, target, x, y)
+        if dirty is not None:
+            return dirty
+        return target.fill_rect(
+            x,
+            y,
+            cards._draw_width + 1,
+            cards._draw_height + 1,
+            cards._table_color,
+        )
+
+    def render_sheet(self, cards=None, columns=13, hidden=False):
+        # Returns an array with the cards (all_cards by default) laid out in a grid
+        if cards is None:
+            cards = self._cards.all_cards
+        self._check_size()
+        width, height = self._size
+        rows = max(1, -(-len(cards) // columns))
+
+        # Make each sprite opaque, then gather them into a (rows, columns, h, w) grid
+        bank = [np.full((height, width), self._cards._table_color, self._dtype)]
+        index = {}
+        order = np.zeros(rows * columns, dtype=np.intp)
+        for i, card in enumerate(cards):
+            key = None if hidden else (card.suit, card.rank)
+            if key not in index:
+                pixels, mask = self.sprite(card, hidden)
+                index[key] = len(bank)
+                bank.append(np.where(mask, pixels, bank[0]))
+            order[i] = index[key]
+        grid = np.stack(bank)[order].reshape(rows, columns, height, width)
+        return grid.transpose(0, 2, 1, 3).reshape(rows * height, columns * width)
+
+    def render_table(self, piles, width, height, target=None):
+        # Draws the cards of each pile where they were last rendered, without changing
+        # their state.  Returns the ArrayTarget, which is created if not given.
+        if target is None:
+            target = ArrayTarget(width, height, self._cards._table_color, self._dtype)
+        for pile in piles:
+            for card in pile.in_pile:
+                if card.position is not None:
+                    pixels, mask = self.sprite(card, card.hidden)
+                    target.blit(pixels, mask, card.position[0], card.position[1])
+        return target
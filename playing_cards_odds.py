@@ -0,0 +1,213 @@
+# SPDX-FileCopyrightText: 2024 Brad Barnett
+#
+# SPDX-License-Identifier: MIT
+"""
+playing_cards_odds.py - Exact odds for the cards remaining in a Cards deck.
+Odds keeps the composition of cards.in_deck up to date from draw and shuffle
+events and answers queries with exact binomial arithmetic instead of simulation.
+Results are memoized per composition, so repeated queries between draws are free.
+
+    from playing_cards import HEARTS, ACE
+
+    odds = Odds(cards)
+    odds.next_rank()                      # {rank: probability} for the next card
+    odds.suit_probability(HEARTS, 3, 2)   # at least 2 hearts in the next 3 cards
+    odds.dealer_bust(upcard, values, hidden=[hole_card])  # the dealer's Cards, {rank: points}
+    odds.batch([("next_rank",), ("rank_probability", [ACE], 2)])
+"""
+
+from playing_cards import SHUFFLE, DRAW
+
+
+try:
+    from math import comb
+except ImportError:  # MicroPython
+
+    def comb(n, k):
+        k = min(k, n - k)
+        result = 1
+        for i in range(1, k + 1):
+            result = result * (n - k + i) // i
+        return result
+
+
+def binomial(n, k):
+    # n choose k, or 0 if k is out of range
+    if k < 0 or k > n:
+        return 0
+    return comb(n, k)
+
+
+def hypergeometric(population, successes, draws, k):
+    # Probability of exactly k successes when drawing without replacement
+    total = binomial(population, draws)
+    if total == 0:
+        return 0.0
+    return binomial(successes, k) * binomial(population - successes, draws - k) / total
+
+
+class Odds:
+    def __init__(self, cards, max_cache=4096):
+        self._cards = cards
+        template = cards.template
+        self._ranks = template.ranks
+        self._suits = template.suits
+        self._full = template.num_decks
+        # (suit, rank) -> index into the composition counts
+        self._index = {
+            (suit, rank): i * len(self._ranks) + j
+            for i, suit in enumerate(self._suits)
+            for j, rank in enumerate(self._ranks)
+        }
+        self._max_cache = max_cache
+        self._cache = {}  # (composition, query) -> result
+        self._sync()
+        cards.add_listener(self._on_event)
+
+    def close(self):  # Stop following the deck
+        self._cards.remove_listener(self._on_event)
+
+    def _sync(self):
+        # Count the cards in the deck from scratch
+        self._counts = [0] * len(self._index)
+        for card in self._cards.in_deck:
+            self._counts[self._index[(card.suit, card.rank)]] += 1
+        self._key = None
+
+    def _on_event(self, event, card, pile):
+        if event == DRAW:
+            self._counts[self._index[(card.suit, card.rank)]] -= 1
+            self._key = None
+        elif event == SHUFFLE:
+            self._counts = [self._full] * len(self._index)
+            self._key = None
+
+    @property
+    def composition(self):
+        # The number of each (suit, rank) remaining as a tuple in template order
+        if self._key is None:
+            self._key = tuple(self._counts)
+        return self._key
+
+    def _memo(self, query, compute, *args):
+        key = (self.composition, query)
+        result = self._cache.get(key)
+        if result is None:
+            if len(self._cache) >= self._max_cache:
+                self._cache.clear()
+            result = self._cache[key] = compute(*args)
+        return result
+
+    def rank_counts(self):
+        # {rank: number remaining}
+        return self._memo(("rank_counts",), self._rank_counts)
+
+    def _rank_counts(self):
+        counts = self.composition
+        n = len(self._ranks)
+        return {
+            rank: sum(counts[i * n + j] for i in range(len(self._suits)))
+            for j, rank in enumerate(self._ranks)
+        }
+
+    def suit_counts(self):
+        # {suit: number remaining}
+        return self._memo(("suit_counts",), self._suit_counts)
+
+    def _suit_counts(self):
+        counts = self.composition
+        n = len(self._ranks)
+        return {suit: sum(counts[i * n : i * n + n]) for i, suit in enumerate(self._suits)}
+
+    def remaining(self):
+        return sum(self.composition)
+
+    def next_rank(self):
+        # {rank: probability the next card has that rank}
+        return self._memo(("next_rank",), self._distribution, self.rank_counts())
+
+    def next_suit(self):
+        # {suit: probability the next card has that suit}
+        return self._memo(("next_suit",), self._distribution, self.suit_counts())
+
+    def _distribution(self, counts):
+        total = self.remaining()
+        return {key: count / total if total else 0.0 for key, count in counts.items()}
+
+    def rank_probability(self, ranks, draws=1, at_least=1):
+        # Probability of at least at_least cards with one of ranks in the next draws cards
+        ranks = tuple(ranks)
+        counts = self.rank_counts()
+        successes = sum(counts[rank] for rank in ranks)
+        query = ("rank_probability", ranks, draws, at_least)
+        return self._memo(query, self._at_least, successes, draws, at_least)
+
+    def suit_probability(self, suit, draws=1, at_least=1):
+        # Probability of at least at_least cards of suit in the next draws cards,
+        # such as completing a flush
+        successes = self.suit_counts()[suit]
+        query = ("suit_probability", suit, draws, at_least)
+        return self._memo(query, self._at_least, successes, draws, at_least)
+
+    def _at_least(self, successes, draws, at_least):
+        population = self.remaining()
+        if draws > population:
+            return 0.0
+        return sum(
+            hypergeometric(population, successes, draws, k)
+            for k in range(at_least, min(successes, draws) + 1)
+        )
+
+    def dealer_bust(self, upcard, values, hidden=(), stand_on=17, hit_soft=False):
+        # Probability a dealer showing the Card upcard busts.  values maps rank to points,
+        # with an Ace counted as 11 until that would bust.  hit_soft makes the dealer hit a
+        # soft stand_on, such as soft 17.
+        # Cards that have been drawn but not seen, such as the dealer's face-down hole
+        # card, must be passed in hidden.  They are unknown to the player, so they are put
+        # back with the remaining deck and the dealer's hole card is drawn from them all.
+        # With hidden empty, the answer is only right before the hole card is dealt.
+        upcard = upcard.rank
+        hidden = tuple(sorted(card.rank for card in hidden))
+        query = ("dealer_bust", upcard, tuple(values.items()), hidden, stand_on, hit_soft)
+        return self._memo(query, self._dealer_bust, upcard, values, hidden, stand_on, hit_soft)
+
+    def _dealer_bust(self, upcard, values, hidden, stand_on, hit_soft):
+        counts = dict(self.rank_counts())
+        for rank in hidden:
+            counts[rank] += 1
+        ranks = [rank for rank in self._ranks if counts[rank]]
+        points = [values[rank] for rank in ranks]
+        memo = {}
+
+        def bust(remaining, total, soft):
+            # remaining is a tuple of counts for ranks; soft is the number of Aces counted as 11
+            while total > 21 and soft:
+                total -= 10
+                soft -= 1
+            if total > 21:
+                return 1.0
+            if total > stand_on or (total == stand_on and not (hit_soft and soft)):
+                return 0.0
+            key = (remaining, total, soft)
+            result = memo.get(key)
+            if result is None:
+                population = sum(remaining)
+                result = 0.0
+                if population:
+                    for i, count in enumerate(remaining):
+                        if count:
+                            drawn = remaining[:i] + (count - 1,) + remaining[i + 1 :]
+                            result += (
+                                count
+                                / population
+                                * bust(drawn, total + points[i], soft + (points[i] == 11))
+                            )
+                memo[key] = result
+            return result
+
+        start = values[upcard]
+        return bust(tuple(counts[rank] for rank in ranks), start, int(start == 11))
+
+    def batch(self, queries):
+        # Answers a list of queries, each a tuple of a method name and its arguments
+        return [getattr(self, query[0])(*query[1:]) for query in queries]
@@ -0,0 +1,65 @@
+# SPDX-FileCopyrightText: 2024 Brad Barnett
+#
+# SPDX-License-Identifier: MIT
+"""
+playing_cards_shuffle.py - NumPy shuffles in bulk for playing_cards.
+BatchShuffler is a Cards shuffler that makes many shuffles at once and uses one
+each time the deck is shuffled.  The *_permutations functions return many
+shuffles of range(n) at once as the rows of an array, such as for testing the
+shuffles for bias.
+
+    cards.shuffler = BatchShuffler()
+    perms = riffle_permutations(10000, 52)
+"""
+
+import numpy as np
+
+
+def permutations(count, n, rng=None):
+    # count uniformly random permutations of range(n) as the rows of an array
+    rng = rng or np.random.default_rng()
+    return np.argsort(rng.random((count, n)), axis=1)
+
+
+def fisher_yates_permutations(count, n, rng=None):
+    # count Fisher-Yates shuffles of range(n), each step done for all rows at once
+    rng = rng or np.random.default_rng()
+    perms = np.tile(np.arange(n), (count, 1))
+    rows = np.arange(count)
+    for i in range(n - 1, 0, -1):
+        j = rng.integers(0, i + 1, size=count)
+        perms[rows, i], perms[rows, j] = perms[rows, j], perms[rows, i]
+    return perms
+
+
+def riffle_permutations(count, n, times=7, rng=None):
+    # count results of riffle shuffling range(n) times times, as modeled by Gilbert, Shannon
+    # and Reeds.  Sorting by random labels of times bits is the inverse of times riffles.
+    rng = rng or np.random.default_rng()
+    labels = rng.integers(0, 1 << times, size=(count, n))
+    inverse = np.argsort(labels, axis=1, kind="stable")
+    return np.argsort(inverse, axis=1)
+
+
+class BatchShuffler:
+    """
+    A shuffler for Cards that makes batch shuffles at once with NumPy and uses one
+    each time the deck is shuffled.
+
+        cards.shuffler = BatchShuffler()
+    """
+
+    def __init__(self, batch=1024, rng=None):
+        self._batch = batch
+        self._rng = rng or np.random.default_rng()
+        self._perms = np.empty((0, 0), dtype=np.intp)
+        self._next = 0
+
+    def __call__(self, cards):
+        n = len(cards)
+        if self._next >= len(self._perms) or self._perms.shape[1] != n:
+            self._perms = permutations(self._batch, n, self._rng)
+            self._next = 0
+        order = self._perms[self._next]
+        self._next += 1
+        cards[:] = [cards[i] for i in order]